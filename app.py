@@ -1,14 +1,27 @@
 import os
-import json
-from datetime import datetime
-from flask import Flask, request, jsonify, redirect, session, url_for, send_from_directory
-from flask_cors import CORS
-from google_auth_oauthlib.flow import InstalledAppFlow
+import hashlib
+import orjson
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from datetime import datetime, timezone
+from flask import Flask, request, jsonify, redirect, session, abort
+from flask.json.provider import JSONProvider
+from flask_session import Session
+from celery import Celery
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
+from google_auth_httplib2 import AuthorizedHttp
 from dotenv import load_dotenv
+from whitenoise import WhiteNoise
+import httplib2
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ── 1) LOAD ENVIRONMENT ────────────────────────────────────────────────────────
 load_dotenv()
@@ -16,89 +29,290 @@ OPENAI_API_KEY   = os.getenv("OPENAI_API_KEY")
 FLASK_SECRET_KEY = os.getenv("FLASK_SECRET_KEY")
 REDIRECT_URI     = os.getenv("REDIRECT_URI", "").strip()
 GOOGLE_CRED_JSON = os.getenv("GOOGLE_CRED_JSON")
+REDIS_URL        = os.getenv("REDIS_URL")
 
 # ── 2) PARSE GOOGLE CREDENTIALS ────────────────────────────────────────────────
 if GOOGLE_CRED_JSON:
     try:
-        parsed_creds = json.loads(GOOGLE_CRED_JSON)
-    except json.JSONDecodeError:
+        parsed_creds = orjson.loads(GOOGLE_CRED_JSON)
+    except orjson.JSONDecodeError:
         raise RuntimeError("Invalid JSON in GOOGLE_CRED_JSON env var")
 elif os.path.exists("credentials.json"):
-    with open("credentials.json", "r") as f:
-        parsed_creds = json.load(f)
+    with open("credentials.json", "rb") as f:
+        parsed_creds = orjson.loads(f.read())
 else:
     raise RuntimeError(
         "Missing Google credentials: set GOOGLE_CRED_JSON or provide credentials.json locally"
     )
 
+# Validate once and freeze; request handlers only read these constants
+if "web" in parsed_creds:
+    CLIENT_TYPE = "web"
+elif "installed" in parsed_creds:
+    CLIENT_TYPE = "installed"
+else:
+    raise RuntimeError("Google credentials must contain a 'web' or 'installed' client")
+CLIENT_CONFIG = MappingProxyType({CLIENT_TYPE: MappingProxyType(dict(parsed_creds[CLIENT_TYPE]))})
+try:
+    CLIENT_ID     = CLIENT_CONFIG[CLIENT_TYPE]["client_id"]
+    CLIENT_SECRET = CLIENT_CONFIG[CLIENT_TYPE]["client_secret"]
+    AUTH_URI      = CLIENT_CONFIG[CLIENT_TYPE]["auth_uri"]
+    TOKEN_URI     = CLIENT_CONFIG[CLIENT_TYPE]["token_uri"]
+except KeyError as e:
+    raise RuntimeError(f"Google credentials are missing {e.args[0]!r}")
+
 # ── 3) VERIFY REQUIRED SECRETS ─────────────────────────────────────────────────
 if not FLASK_SECRET_KEY:
     raise RuntimeError("You must set FLASK_SECRET_KEY in your environment")
 if not REDIRECT_URI:
     raise RuntimeError("You must set REDIRECT_URI in your env to your OAuth callback")
 # Note: OPENAI_API_KEY is optional—if missing, /api/tasks will fall back.
+# Note: REDIS_URL is optional—if missing, sessions stay in the signed cookie.
 
 # ── 4) OAUTH SETTINGS ──────────────────────────────────────────────────────────
-SCOPES = ["https://www.googleapis.com/auth/calendar"]
+SCOPES = ("https://www.googleapis.com/auth/calendar",)
+
+def _make_flow(state=None, code_verifier=None):
+    # imported on first use: only the OAuth routes need these
+    from google_auth_oauthlib.flow import Flow
+    from requests_oauthlib import OAuth2Session
+
+    session_ = OAuth2Session(CLIENT_ID, scope=SCOPES, redirect_uri=REDIRECT_URI, state=state)
+    return Flow(
+        session_, CLIENT_TYPE, CLIENT_CONFIG,
+        redirect_uri=REDIRECT_URI,
+        code_verifier=code_verifier
+    )
+
+# Flows started by /login, keyed by state, so /oauth2callback can finish the
+# same object instead of rebuilding one. Entries expire after FLOW_TTL seconds,
+# and at most FLOW_STASH_SIZE are kept: abandoned logins drop the oldest, whose
+# callback then just rebuilds the flow from the session.
+FLOW_TTL = 600
+FLOW_STASH_SIZE = 256
+_pending_flows = OrderedDict()
+
+def _stash_flow(state, flow):
+    now = time.monotonic()
+    # insertion order is start order, so expired entries sit at the front
+    while _pending_flows and now - next(iter(_pending_flows.values()))[1] > FLOW_TTL:
+        _pending_flows.popitem(last=False)
+    _pending_flows[state] = (flow, now)
+    while len(_pending_flows) > FLOW_STASH_SIZE:
+        _pending_flows.popitem(last=False)
+
+def _take_flow(state, code_verifier=None):
+    flow, started = _pending_flows.pop(state, (None, 0.0))
+    if flow is None or time.monotonic() - started > FLOW_TTL:
+        # started on another worker (or expired): rebuild from the session
+        flow = _make_flow(state, code_verifier)
+    return flow
 
 # ── 5) FLASK APP SETUP ─────────────────────────────────────────────────────────
 app = Flask(__name__, static_folder="static")
 app.secret_key = FLASK_SECRET_KEY
-CORS(app, supports_credentials=True)
+# index.html (and static/) are served by WhiteNoise before Flask sees the
+# request, with ETag/Last-Modified so repeat visits get a 304
+def _static_headers(headers, path, url):
+    # HTML isn't fingerprinted, so always revalidate instead of serving stale
+    if path.endswith(".html"):
+        headers["Cache-Control"] = "no-cache"
+
+app.wsgi_app = WhiteNoise(
+    app.wsgi_app,
+    root=app.static_folder,
+    index_file=True,
+    max_age=3600,
+    add_headers_function=_static_headers
+)
+
+# CORS: echo the caller's origin with credentials allowed (what
+# flask_cors did with supports_credentials=True). Flask already answers
+# OPTIONS for every route, so preflights just need the extra headers.
+@app.after_request
+def _cors_headers(resp):
+    origin = request.headers.get("Origin")
+    if origin:
+        resp.headers["Access-Control-Allow-Origin"] = origin
+        resp.headers["Access-Control-Allow-Credentials"] = "true"
+        resp.vary.add("Origin")
+        if request.method == "OPTIONS":
+            resp.headers["Access-Control-Allow-Methods"] = resp.headers.get("Allow", "GET, POST, OPTIONS")
+            req_headers = request.headers.get("Access-Control-Request-Headers")
+            if req_headers:
+                resp.headers["Access-Control-Allow-Headers"] = req_headers
+    return resp
+
+# Server-side sessions: the cookie carries only a session id, so the OAuth
+# credentials aren't serialized + HMAC-signed into every response
+_redis = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+if _redis is not None:
+    app.config.update(
+        SESSION_TYPE="redis",
+        SESSION_REDIS=_redis,
+        SESSION_PERMANENT=False,
+    )
+    Session(app)
+
+# JSON in/out goes through orjson instead of the stdlib json module
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+app.json = OrjsonProvider(app)
+
+def request_json():
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        abort(400)
 
 # ── 6) IMPORT PROJECT LOGIC ────────────────────────────────────────────────────
-from task_breakdown import breakdown_goal
-from calendar_integration import schedule_tasks, create_calendar_events
+from task_breakdown import breakdown_goal, placeholder_tasks, BreakdownError
+from calendar_integration import schedule_tasks, create_calendar_events, weekday_mask, parse_iso
 
 # ── 7) HELPER: BUILD & REFRESH GOOGLE CALENDAR SERVICE ──────────────────────────
-def get_calendar_service():
-    creds_info = session.get("credentials")
-    if not creds_info:
-        return None
+# Transports are shared; credentials stay per session. Token refreshes go
+# through one pooled requests.Session, and Calendar calls borrow a keep-alive
+# httplib2.Http from a small pool for the length of one request (httplib2 is
+# not safe to share between concurrent requests). A pool rather than
+# threading.local: under gevent that is per greenlet, i.e. per web request,
+# so connections would never be reused.
+_refresh_session = requests.Session()
+_refresh_session.mount("https://", HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
 
-    creds = Credentials(
-        token=creds_info["token"],
-        refresh_token=creds_info.get("refresh_token"),
-        token_uri=creds_info["token_uri"],
-        client_id=creds_info["client_id"],
-        client_secret=creds_info["client_secret"],
-        scopes=creds_info["scopes"],
-    )
+HTTP_POOL_SIZE = 32
+
+class _HttpPool:
+    """httplib2.Http stand-in that lends each request an idle keep-alive Http."""
+
+    def __init__(self, size):
+        self._size = size
+        self._idle = []  # LIFO, so the most recently used connection is reused
+        self._defaults = httplib2.Http(timeout=30)
+
+    def request(self, *args, **kwargs):
+        # list pop/append are atomic, for both threads and greenlets
+        try:
+            http = self._idle.pop()
+        except IndexError:
+            http = httplib2.Http(timeout=30)
+        # httplib2 reads the whole body inside request(), so the Http is free
+        # again on return; one that raised may hold a broken socket, drop it
+        response = http.request(*args, **kwargs)
+        if len(self._idle) < self._size:
+            self._idle.append(http)
+        return response
+
+    def __getattr__(self, name):
+        # attribute reads (timeout, redirect_codes, ...) see the shared defaults
+        return getattr(self._defaults, name)
 
+_shared_http = _HttpPool(HTTP_POOL_SIZE)
+
+class OrjsonModel(JsonModel):
+    """JsonModel that encodes request bodies and decodes responses with orjson."""
+
+    def serialize(self, body_value):
+        return orjson.dumps(body_value).decode()
+
+    def deserialize(self, content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return content.decode("utf-8") if isinstance(content, bytes) else content
+
+_json_model = OrjsonModel()
+
+# One Calendar Resource per process. build() parses the ~200KB discovery doc
+# and the Resource holds ~0.4MB of method tables, so it is built once, with no
+# credentials: every call runs over the caller's AuthorizedHttp, passed in as
+# execute(http=...). A call that forgets it goes out unauthenticated and 401s.
+_calendar = None
+
+def _calendar_service():
+    global _calendar
+    if _calendar is None:
+        # googleapiclient.discovery is heavy to import; only load it once needed
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.discovery_cache import get_static_doc
+
+        _calendar = build_from_document(
+            orjson.loads(get_static_doc("calendar", "v3")),
+            http=_shared_http,
+            model=_json_model
+        )
+    return _calendar
+
+def _authorized_http(creds):
+    return AuthorizedHttp(creds, http=_shared_http)
+
+def _load_credentials(raw, min_valid=0):
+    """
+    Rebuilds Credentials from their stored creds.to_json() form (older
+    sessions hold a plain dict), refreshing them when expired or, with
+    `min_valid`, when fewer than that many seconds of validity are left.
+    Returns (creds, stored_token), or (None, None) if they're unusable.
+    """
     try:
-        if not creds.valid:
-            creds.refresh(Request())
-        session["credentials"] = {
-            "token": creds.token,
-            "refresh_token": creds.refresh_token,
-            "token_uri": creds.token_uri,
-            "client_id": creds.client_id,
-            "client_secret": creds.client_secret,
-            "scopes": creds.scopes,
-        }
-    except RefreshError:
+        creds_info = orjson.loads(raw) if isinstance(raw, str) else raw
+        creds = Credentials.from_authorized_user_info(creds_info, SCOPES)
+        # `expired` already includes google-auth's early-refresh margin;
+        # expiry is naive UTC
+        if (creds.token is None or creds.expired or (
+                min_valid and creds.expiry and
+                creds.expiry.replace(tzinfo=timezone.utc).timestamp() - time.time() < min_valid)):
+            creds.refresh(Request(session=_refresh_session))
+    except (ValueError, RefreshError):
+        return None, None
+    return creds, creds_info.get("token")
+
+def _store_credentials(creds):
+    session["credentials"] = creds.to_json()
+
+def get_calendar_http(min_valid=0):
+    """
+    AuthorizedHttp for the session's Google credentials, or None. The stored
+    token is refreshed first if it has less than `min_valid` seconds left.
+    """
+    raw = session.get("credentials")
+    if not raw:
+        return None
+
+    creds, stored_token = _load_credentials(raw, min_valid)
+    if creds is None:
         session.clear()
         return None
+    # only touch the session when the token actually changed
+    if creds.token != stored_token:
+        _store_credentials(creds)
 
-    return build("calendar", "v3", credentials=creds)
+    return _authorized_http(creds)
 
-# ── 8) ROUTE: FRONT-END ─────────────────────────────────────────────────────────
-@app.route("/")
-def index():
-    return send_from_directory(app.static_folder, "index.html")
+# ── 8) FRONT-END ────────────────────────────────────────────────────────────────
+# "/" is answered by WhiteNoise (see section 5); there is no Flask route for it.
 
 # ── 9) LOGIN → GOOGLE OAUTH ────────────────────────────────────────────────────
 @app.route("/login")
 def login():
     try:
         session.clear()
-        flow = InstalledAppFlow.from_client_config(
-            parsed_creds,
-            scopes=SCOPES,
-            redirect_uri=REDIRECT_URI
-        )
+        flow = _make_flow()
         auth_url, state = flow.authorization_url(prompt="consent", access_type="offline")
         session["state"] = state
+        session["code_verifier"] = flow.code_verifier
+        _stash_flow(state, flow)
         return redirect(auth_url)
     except Exception as e:
         app.logger.exception("Error in /login")
@@ -109,84 +323,157 @@ def login():
 def oauth2callback():
     try:
         state = session.pop("state", None)
+        code_verifier = session.pop("code_verifier", None)
         if not state:
             return jsonify({"error": "invalid_state"}), 400
 
-        flow = InstalledAppFlow.from_client_config(
-            parsed_creds,
-            scopes=SCOPES,
-            redirect_uri=REDIRECT_URI,
-            state=state
-        )
+        flow = _take_flow(state, code_verifier)
         flow.fetch_token(authorization_response=request.url)
-        creds = flow.credentials
-        session["credentials"] = {
-            "token": creds.token,
-            "refresh_token": creds.refresh_token,
-            "token_uri": creds.token_uri,
-            "client_id": creds.client_id,
-            "client_secret": creds.client_secret,
-            "scopes": creds.scopes,
-        }
-        return redirect(url_for("index"))
+        _store_credentials(flow.credentials)
+        return redirect("/")
     except Exception as e:
         app.logger.exception("Error in /oauth2callback")
         return jsonify({"error": "oauth_callback_failed", "message": str(e)}), 500
 
 # ──11) API: FETCH EVENTS ────────────────────────────────────────────────────────
-@app.route("/api/events")
-def api_events():
-    service = get_calendar_service()
-    if not service:
-        return jsonify({"error": "not_authenticated"}), 401
+# Raw events per sync token. Only the token travels in the session; a worker
+# that has never seen a token just falls back to a full sync.
+SYNC_CACHE_SIZE = 256
+_sync_cache = OrderedDict()
+# Partial response: only what _build_events and the sync bookkeeping read
+EVENT_FIELDS = (
+    "items(id,status,summary,start/dateTime,end/dateTime,colorId),"
+    "nextPageToken,nextSyncToken"
+)
 
-    # fetch Google color map
-    colors_def = service.colors().get().execute().get("event", {})
-    now = datetime.utcnow().isoformat() + "Z"
-    items = service.events().list(
-        calendarId="primary",
-        timeMin=now,
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute().get("items", [])
-
-    events = []
-    for e in items:
-        sd = e["start"].get("dateTime")
-        ed = e["end"].get("dateTime")
+# Google's event color palette is global and effectively static
+COLORS_TTL = 24 * 3600
+_colors_cache = {"at": 0.0, "data": None}
+
+def _get_colors(service, http):
+    now = time.monotonic()
+    if _colors_cache["data"] is None or now - _colors_cache["at"] > COLORS_TTL:
+        _colors_cache["data"] = service.colors().get(fields="event").execute(http=http).get("event", {})
+        _colors_cache["at"] = now
+    return _colors_cache["data"]
+
+def _list_event_changes(service, http, sync_token=None):
+    """
+    Pages through events().list and returns (items, nextSyncToken).
+    Without a sync token this is a full sync; with one, only changes since then.
+    """
+    items, page_token = [], None
+    while True:
+        params = {
+            "calendarId": "primary",
+            "singleEvents": True,
+            "maxResults": 2500,
+            "fields": EVENT_FIELDS,
+        }
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+        resp = service.events().list(**params).execute(http=http)
+        items.extend(resp.get("items", []))
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return items, resp.get("nextSyncToken")
+
+def _build_events(raw_items, colors_def, now):
+    """Returns (upcoming events sorted by start, earliest end among them)."""
+    parse = parse_iso
+    empty = {}
+    keyed = []
+    append = keyed.append
+    expires = None
+    for e in raw_items:
+        # partial responses drop empty objects: an all-day event (start.date
+        # only) arrives with no start/end at all, as do cancelled deltas
+        sd = (e.get("start") or empty).get("dateTime")
+        ed = (e.get("end") or empty).get("dateTime")
         if not (sd and ed):
             continue
+        end = parse(ed)
+        if end <= now:
+            continue
+        if expires is None or end < expires:
+            expires = end
         cid = e.get("colorId")
-        bg = colors_def.get(cid, {}).get("background") if cid else None
-        fg = colors_def.get(cid, {}).get("foreground") if cid else None
+        color = colors_def.get(cid, empty) if cid else empty
 
-        events.append({
+        append((parse(sd), {
             "title":     e.get("summary", "(No title)"),
             "start":     sd,
             "end":       ed,
-            "color":     bg,
-            "textColor": fg,
+            "color":     color.get("background"),
+            "textColor": color.get("foreground"),
             "googleColor": cid
-        })
+        }))
+    # sort on the start parsed above instead of re-parsing it in the key
+    keyed.sort(key=lambda pair: pair[0])
+    return [ev for _, ev in keyed], expires
+
+@app.route("/api/events")
+def api_events():
+    http = get_calendar_http()
+    if not http:
+        return jsonify({"error": "not_authenticated"}), 401
+    service = _calendar_service()
 
-    return jsonify({"events": events})
+    # Google color map (cached process-wide)
+    colors_def = _get_colors(service, http)
+
+    # incremental sync: reuse the cached copy when this worker knows the token
+    token = session.get("calendar_sync_token")
+    entry = _sync_cache.pop(token, None) if token else None
+    if entry is not None:
+        try:
+            changes, next_token = _list_event_changes(service, http, token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            entry = None  # token expired → full sync below
+    if entry is None:
+        changes, next_token = _list_event_changes(service, http)
+        entry = {"items": {}, "body": None, "expires": None}
+
+    if changes:
+        for e in changes:
+            if e.get("status") == "cancelled":
+                entry["items"].pop(e["id"], None)
+            else:
+                entry["items"][e["id"]] = e
+        entry["body"] = None
+
+    # rebuild only when something changed or a cached event has ended; the
+    # encoded body is kept so unchanged syncs skip serialization entirely
+    now = datetime.now(timezone.utc)
+    if entry["body"] is None or (entry["expires"] and entry["expires"] <= now):
+        events, entry["expires"] = _build_events(entry["items"].values(), colors_def, now)
+        entry["body"] = orjson.dumps({"events": events})
+
+    if next_token:
+        _sync_cache[next_token] = entry
+        while len(_sync_cache) > SYNC_CACHE_SIZE:
+            _sync_cache.popitem(last=False)
+        if next_token != token:
+            session["calendar_sync_token"] = next_token
+
+    return app.response_class(entry["body"], mimetype="application/json")
 
 # ──12) HELPER: DECIDE TOTAL TASKS ───────────────────────────────────────────────
 def decide_total_tasks(goal: str, level: str, deadline: str, override: int = None) -> int:
+    # honor override before doing any date work
+    if override is not None and override >= 1:
+        return override
     # compute days_left
     try:
-        today   = datetime.utcnow().date()
+        today   = datetime.now(timezone.utc).date()
         dl_date = datetime.fromisoformat(deadline).date()
         days_left = max((dl_date - today).days, 1)
     except Exception:
         days_left = 7
-    # baseline by proficiency
-    prof_map = {"easy": 0.8, "medium": 1.0, "hard": 1.2}
-    prof_mult = prof_map.get(level.lower(), 1.0)
-    base_count = int(round(days_left * prof_mult))
-    # honor override
-    if override is not None and override >= 1:
-        return override
     # (optional) complexity adjustment omitted / falls through
     # fallback
     if level.lower() == "easy":
@@ -194,10 +481,51 @@ def decide_total_tasks(goal: str, level: str, deadline: str, override: int = Non
     return max(days_left, 1)
 
 # ──13) API: GENERATE TASKS ──────────────────────────────────────────────────────
+# Identical inputs on the same day build the same prompt, so reuse the answer
+# instead of another OpenAI round trip. Shared through Redis when configured,
+# otherwise kept per process. Entries are stored encoded so callers can't
+# mutate the cached copy.
+BREAKDOWN_TTL = 24 * 3600
+BREAKDOWN_CACHE_SIZE = 1024
+_breakdown_cache = OrderedDict()
+
+def _breakdown_key(goal, current_level, target_level, deadline):
+    # the prompt depends on days left, so today's date is part of the key
+    today = datetime.now(timezone.utc).date().isoformat()
+    raw = "\x1f".join((goal, current_level, target_level, deadline, today))
+    return "bd:" + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+def cached_breakdown(goal, current_level, target_level, deadline):
+    key = _breakdown_key(goal, current_level, target_level, deadline)
+    if _redis is not None:
+        hit = _redis.get(key)
+    else:
+        hit, expires = _breakdown_cache.get(key, (None, 0.0))
+        if hit is not None and expires > time.monotonic():
+            _breakdown_cache.move_to_end(key)
+        else:
+            hit = None
+    if hit is not None:
+        return orjson.loads(hit)
+
+    try:
+        tasks = breakdown_goal(goal, current_level, target_level, deadline)
+    except BreakdownError:
+        # placeholders stand in for this request only; never cache them
+        return placeholder_tasks(deadline)
+    blob = orjson.dumps(tasks)
+    if _redis is not None:
+        _redis.set(key, blob, ex=BREAKDOWN_TTL)
+    else:
+        _breakdown_cache[key] = (blob, time.monotonic() + BREAKDOWN_TTL)
+        while len(_breakdown_cache) > BREAKDOWN_CACHE_SIZE:
+            _breakdown_cache.popitem(last=False)
+    return tasks
+
 @app.route("/api/tasks", methods=["POST"])
 def api_tasks():
     # 1) Load the JSON payload
-    data = request.get_json(force=True)
+    data = request_json()
 
     # 2) Pull out all of our inputs, using Python’s .strip()
     goal           = data.get("goal", "").strip()
@@ -206,20 +534,17 @@ def api_tasks():
     deadline       = data.get("deadline", "").strip()
     # (If you have an override, you can grab it here too)
     # override = data.get("overrideTaskCount", None)
+    if not goal:
+        return jsonify({"error": "missing_goal"}), 400
 
     # 3) Fallback to placeholders if no OPENAI key
     if not OPENAI_API_KEY:
-        placeholder = [
-            {"id": i+1, "task": f"(Step {i+1} placeholder)", "duration_hours": 1.0}
-            for i in range(max((datetime.fromisoformat(deadline).date() - datetime.utcnow().date()).days, 1))
-        ]
-        return jsonify({"tasks": placeholder})
+        return jsonify({"tasks": placeholder_tasks(deadline)})
 
     # 4) Generate
     try:
-        tasks = breakdown_goal(goal, current_level, target_level, deadline)
-        for t in tasks:
-            t.setdefault("duration_hours", 1.0)
+        # breakdown_goal always fills in duration_hours (1.0 by default)
+        tasks = cached_breakdown(goal, current_level, target_level, deadline)
         return jsonify({"tasks": tasks})
     except Exception as e:
         app.logger.exception("Error in /api/tasks")
@@ -227,40 +552,129 @@ def api_tasks():
 
 
 # ──14) API: SCHEDULE INTO GOOGLE CALENDAR ───────────────────────────────────────
+# Scheduling + event inserts run as a Celery job so the request returns a job
+# id right away; the client polls /api/schedule/status/<jobId>. Without
+# REDIS_URL there is no broker, so jobs run eagerly inside the request.
+celery = Celery("projectmanager", broker=REDIS_URL, backend=REDIS_URL)
+celery.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    task_always_eager=not REDIS_URL,
+    # a job unacked this long (its worker died) is handed to another worker;
+    # the Redis default of an hour would outlive the job's access token
+    broker_transport_options={"visibility_timeout": 15 * 60},
+)
+
+# Only the short-lived access token travels through the broker; the refresh
+# token and client secret stay in the session, so the worker can't refresh it.
+# api_schedule refreshes it first unless SCHEDULE_TOKEN_MARGIN (30 min) is
+# left, which covers a queue wait plus one crash redelivery after the 15 min
+# visibility timeout. A job that starts later than that fails with "token
+# expired"; the user just schedules again.
+SCHEDULE_TOKEN_MARGIN = 30 * 60
+
+# acks_late means a crashed worker's job is delivered again, so a job must be
+# safe to re-run: its plan is kept in Redis under the job id (a re-run would
+# otherwise see its own first inserts as busy and pick new slots), and each
+# event gets an id derived from the job id, so re-inserting it answers 409
+# instead of creating a copy.
+SCHEDULE_PLAN_TTL = 24 * 3600
+
+@celery.task(bind=True)
+def do_schedule(self, access_token, token_expiry, tasks, start_iso, deadline, max_hours, allowed_mask):
+    expiry = None
+    if token_expiry:
+        # google-auth keeps expiry as naive UTC
+        expiry = datetime.fromtimestamp(token_expiry, timezone.utc).replace(tzinfo=None)
+    creds = Credentials(token=access_token, expiry=expiry)
+    if not access_token or creds.expired:
+        raise RuntimeError("Google access token expired before the job ran; please try again")
+    service = _calendar_service()
+    http    = _authorized_http(creds)
+
+    job_id   = self.request.id
+    plan_key = "schedplan:" + job_id
+    plan     = _redis.get(plan_key) if _redis is not None else None
+    if plan is not None:
+        scheduled, unscheduled = orjson.loads(plan)
+    else:
+        scheduled, unscheduled = schedule_tasks(
+            service,
+            tasks,
+            start_iso,
+            deadline,
+            max_hours_per_day   = max_hours,
+            allowed_days_mask   = allowed_mask,
+            http                = http
+        )
+        if _redis is not None:
+            _redis.set(plan_key, orjson.dumps([scheduled, unscheduled]), ex=SCHEDULE_PLAN_TTL)
+    # uuid hex digits are valid event-id characters (base32hex: a-v, 0-9)
+    ids = create_calendar_events(
+        service, scheduled, id_prefix="pm" + job_id.replace("-", ""), http=http
+    )
+    return {
+        "eventIds":    ids,
+        "scheduled":   scheduled,
+        "unscheduled": unscheduled
+    }
+
+# Job ids issued to this session; status lookups for any other id are refused
+# so one user can't read another's schedule by guessing ids.
+SCHEDULE_JOBS_KEPT = 20
+
+def _remember_job(job_id):
+    session["schedule_jobs"] = (session.get("schedule_jobs", []) + [job_id])[-SCHEDULE_JOBS_KEPT:]
+
+def _job_response(job_id, result):
+    if not result.ready():
+        return jsonify({"jobId": job_id, "done": False})
+    if result.failed():
+        app.logger.error("Schedule job %s failed: %s", job_id, result.result)
+        return jsonify({"error": "schedule_failed", "message": str(result.result)}), 500
+    return jsonify({"jobId": job_id, "done": True, **result.result})
+
 @app.route("/api/schedule", methods=["POST"])
 def api_schedule():
-    data     = request.get_json(force=True)
+    data     = request_json()
     settings = data.get("settings", {})
     max_hours = settings.get("maxHoursPerDay", None)
-    allowed   = settings.get("allowedDaysOfWeek", None)
+    allowed   = weekday_mask(settings.get("allowedDaysOfWeek", None))
 
-    service   = get_calendar_service()
-    if not service:
+    http = get_calendar_http(min_valid=SCHEDULE_TOKEN_MARGIN)
+    if not http:
         return jsonify({"error": "not_authenticated"}), 401
+    creds = http.credentials
+    # google-auth keeps expiry as naive UTC
+    expiry = creds.expiry.replace(tzinfo=timezone.utc).timestamp() if creds.expiry else None
 
     tasks      = data.get("tasks", [])
     start_iso  = data.get("start_date")
     deadline   = data.get("deadline")
 
     try:
-        scheduled, unscheduled = schedule_tasks(
-            service,
-            tasks,
-            start_iso,
-            deadline,
-            max_hours_per_day   = max_hours,
-            allowed_days_of_week= allowed
+        job = do_schedule.delay(
+            creds.token, expiry, tasks, start_iso, deadline, max_hours, allowed
         )
-        ids = create_calendar_events(service, scheduled)
-        return jsonify({
-            "eventIds":    ids,
-            "scheduled":   scheduled,
-            "unscheduled": unscheduled
-        })
     except Exception as e:
         app.logger.exception("Error in /api/schedule")
         return jsonify({"error": "schedule_failed", "message": str(e)}), 500
+    _remember_job(job.id)
+    return _job_response(job.id, job)
+
+@app.route("/api/schedule/status/<job_id>")
+def api_schedule_status(job_id):
+    # Eager jobs (no REDIS_URL) finish inside POST /api/schedule and leave no
+    # result behind to look up
+    if not REDIS_URL or job_id not in session.get("schedule_jobs", ()):
+        return jsonify({"error": "unknown_job"}), 404
+    try:
+        return _job_response(job_id, celery.AsyncResult(job_id))
+    except Exception as e:
+        app.logger.exception("Error reading schedule job %s", job_id)
+        return jsonify({"error": "status_unavailable", "message": str(e)}), 503
 
 # ──15) RUN APP FOR LOCAL DEBUG ─────────────────────────────────────────────────
+# Production runs under gunicorn instead: gunicorn -c gunicorn.conf.py app:app
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=int(os.getenv("PORT", 5000)))
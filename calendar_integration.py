@@ -1,11 +1,141 @@
-from datetime import datetime, date, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
 from zoneinfo import ZoneInfo
 from googleapiclient.errors import HttpError
 
+try:
+    # C parser; much faster than fromisoformat on the busy/event timestamps
+    from ciso8601 import parse_datetime as parse_iso
+except ImportError:
+    parse_iso = datetime.fromisoformat
+
 # Constants
-LOCAL_TZ    = ZoneInfo("America/Los_Angeles")
+LOCAL_TZ_NAME = "America/Los_Angeles"
+LOCAL_TZ    = ZoneInfo(LOCAL_TZ_NAME)
 WORK_START  = 9   #  9:00 AM
 WORK_END    = 22  # 10:00 PM
+# tz-aware times, so datetime.combine(day, ...) needs no tzinfo argument
+DAY_START_T = time(WORK_START, tzinfo=LOCAL_TZ)
+DAY_END_T   = time(WORK_END, tzinfo=LOCAL_TZ)
+BATCH_SIZE  = 50  # Calendar API accepts at most 50 calls per batch request
+INSERT_WORKERS = 16  # parallel inserts when the batch endpoint isn't available
+ONE_US      = timedelta(microseconds=1)
+FREEBUSY_SPAN = timedelta(days=60)  # longest range asked of a single free/busy query
+
+# Weekday bits: Monday = bit 0 … Sunday = bit 6
+DAY_BITS      = {"MO": 1, "TU": 2, "WE": 4, "TH": 8, "FR": 16, "SA": 32, "SU": 64}
+ALL_DAYS_MASK = 0x7F
+
+def weekday_mask(days):
+    """
+    ["MO","WE","FR"] → 7-bit weekday mask. None/empty means every day;
+    unknown codes are ignored.
+    """
+    if not days:
+        return ALL_DAYS_MASK
+    mask = 0
+    for d in days:
+        mask |= DAY_BITS.get(d, 0)
+    return mask
+
+def _day_steps(mask):
+    """
+    For each weekday, the timedelta to the next allowed weekday after it.
+    `mask` must have at least one of its 7 bits set.
+    """
+    return [
+        timedelta(days=next(k for k in range(1, 8) if (mask >> ((wd + k) % 7)) & 1))
+        for wd in range(7)
+    ]
+
+class _DayRooms:
+    """
+    Max segment tree over per-day room (the longest task a day can still
+    take). first_fit(lo, need) returns the earliest day index ≥ lo with
+    room ≥ need, or -1, in O(log days).
+    """
+
+    def __init__(self, rooms):
+        size = 1
+        while size < len(rooms):
+            size *= 2
+        self.size = size
+        self.tree = [-1] * (2 * size)
+        self.tree[size:size + len(rooms)] = rooms
+        for i in range(size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def set(self, i, room):
+        i += self.size
+        self.tree[i] = room
+        i //= 2
+        while i:
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+            i //= 2
+
+    def first_fit(self, lo, need):
+        return self._find(1, 0, self.size, lo, need)
+
+    def _find(self, node, node_lo, node_hi, lo, need):
+        if node_hi <= lo or self.tree[node] < need:
+            return -1
+        if node_hi - node_lo == 1:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        found = self._find(2 * node, node_lo, mid, lo, need)
+        return found if found >= 0 else self._find(2 * node + 1, mid, node_hi, lo, need)
+
+
+def _fetch_busy(service, time_min, time_max, calendar_ids, http=None):
+    """
+    Busy (start, end) pairs for every calendar in `calendar_ids`, as aware
+    datetimes carrying whatever offset Google returned (compare by instant).
+    Spans longer than FREEBUSY_SPAN are split up, and the pieces go out
+    together in one batch request. Failed lookups are logged and skipped.
+    """
+    items  = [{"id": cid} for cid in calendar_ids]
+    ranges = []
+    while time_min < time_max:
+        ranges.append((time_min, min(time_min + FREEBUSY_SPAN, time_max)))
+        time_min = ranges[-1][1]
+
+    # partial response: only the per-calendar busy/errors map is read
+    queries = [
+        service.freebusy().query(
+            body={
+                "timeMin": lo.isoformat(),
+                "timeMax": hi.isoformat(),
+                "timeZone": LOCAL_TZ_NAME,
+                "items": items
+            },
+            fields="calendars"
+        )
+        for lo, hi in ranges
+    ]
+
+    busy = []
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            print("⚠️ free/busy lookup failed:", exception)
+            return
+        for cal in response["calendars"].values():
+            for period in cal.get("busy", ()):
+                busy.append((parse_iso(period["start"]), parse_iso(period["end"])))
+
+    try:
+        if len(queries) > 1 and hasattr(service, "new_batch_http_request"):
+            batch = service.new_batch_http_request(callback=collect)
+            for q in queries:
+                batch.add(q)
+            batch.execute(http=http)
+        else:
+            for q in queries:
+                collect(None, q.execute(http=http), None)
+    except HttpError as e:
+        collect(None, None, e)
+    return busy
+
 
 def schedule_tasks(
     service,
@@ -13,15 +143,19 @@ def schedule_tasks(
     start_iso,
     deadline_iso,
     max_hours_per_day=None,
-    allowed_days_of_week=None
+    allowed_days_mask=ALL_DAYS_MASK,
+    calendar_ids=("primary",),
+    http=None
 ):
     """
-    service: authorized Google Calendar service
+    service: Google Calendar service
     tasks:   [ {"id":…, "task":…, "duration_hours":…}, … ]
     start_iso:    ISO timestamp string when scheduling may begin (ignored—always tomorrow)
     deadline_iso: ISO date string ("YYYY-MM-DD") by which all tasks must be scheduled
     max_hours_per_day: (float) how many total hours of tasks may be placed on any given day
-    allowed_days_of_week: list of strings, e.g. ["MO","TU","WE","TH","FR"], or None
+    allowed_days_mask: 7-bit weekday mask from weekday_mask() (Monday = bit 0)
+    calendar_ids: calendars whose busy time blocks scheduling (at most 50)
+    http: authorized transport to run the requests over (None: the service's own)
 
     Returns:
       scheduled:   [ {"summary":…, "start":iso, "end":iso}, … ]
@@ -29,141 +163,205 @@ def schedule_tasks(
     """
 
     # 1) Always start at WORK_START tomorrow in LOCAL_TZ
-    now      = datetime.fromisoformat(start_iso).astimezone(LOCAL_TZ)
+    now      = parse_iso(start_iso).astimezone(LOCAL_TZ)
     tomorrow = now.date() + timedelta(days=1)
-    dt       = datetime.combine(
-                 tomorrow,
-                 time(WORK_START, 0),
-                 tzinfo=LOCAL_TZ
-               )
 
     # 2) Parse deadline
     try:
         deadline_date = datetime.fromisoformat(deadline_iso).date()
     except Exception:
-        deadline_date = datetime.utcnow().date() + timedelta(days=7)
+        deadline_date = datetime.now(timezone.utc).date() + timedelta(days=7)
 
-    # We want up through midnight after the deadline date
-    time_max = datetime.combine(
-        deadline_date + timedelta(days=1),
-        time(0, 0),
-        tzinfo=LOCAL_TZ
-    )
+    # 3) Work windows for every allowed day up to the deadline, hopping
+    #    straight from one allowed weekday to the next
+    day_windows = []
+    mask = allowed_days_mask & ALL_DAYS_MASK
+    if mask:
+        steps = _day_steps(mask)
+        day = tomorrow
+        if not (mask >> day.weekday()) & 1:
+            day += steps[day.weekday()]
+        while day <= deadline_date:
+            day_windows.append((
+                day,
+                datetime.combine(day, DAY_START_T),
+                datetime.combine(day, DAY_END_T)
+            ))
+            day += steps[day.weekday()]
+    if not day_windows:
+        return [], [{"id": t["id"], "task": t["task"]} for t in tasks]
 
-    # 3) Fetch existing busy slots
-    fb_req = {
-        "timeMin": dt.isoformat(),
-        "timeMax": time_max.isoformat(),
-        "timeZone": str(LOCAL_TZ),
-        "items": [{"id": "primary"}]
-    }
-    busy = []
-    try:
-        resp = service.freebusy().query(body=fb_req).execute()
-        for period in resp["calendars"]["primary"]["busy"]:
-            start = datetime.fromisoformat(period["start"]).astimezone(LOCAL_TZ)
-            end   = datetime.fromisoformat(period["end"]).astimezone(LOCAL_TZ)
-            busy.append((start, end))
-    except HttpError as e:
-        print("⚠️ free/busy lookup failed:", e)
+    # 4) Fetch existing busy slots, only across the span of those windows
+    busy = _fetch_busy(service, day_windows[0][1], day_windows[-1][2], calendar_ids, http)
+
+    # Sort + merge once (aware datetimes, compared by instant); every day's
+    # windows are carved from this list
+    busy.sort()
+    merged = []
+    for bs, be in busy:
+        if merged and bs <= merged[-1][1]:
+            if be > merged[-1][1]:
+                merged[-1] = (merged[-1][0], be)
+        else:
+            merged.append((bs, be))
+
+    # 5) Carve each day's free windows in one sweep: days and blocks are both
+    # in order, so `lo` only moves forward past blocks that ended already.
+    # Blocks keep the offset they were parsed with (aware datetimes compare by
+    # instant); only a block end that becomes a window start is converted to
+    # LOCAL_TZ, since slots are emitted with the zone's own offsets.
+    days, free = [], []
+    lo = 0
+    for day, window_start, window_end in day_windows:
+        while lo < len(merged) and merged[lo][1] <= window_start:
+            lo += 1
+        # windows are (start, length in µs) so fits are plain int compares
+        windows, cursor = [], window_start
+        i = lo
+        while i < len(merged) and merged[i][0] < window_end:
+            bs, be = merged[i]
+            if bs > cursor:
+                windows.append((cursor, (bs - cursor) // ONE_US))
+            if be > cursor:
+                cursor = be.astimezone(LOCAL_TZ)
+            i += 1
+        if cursor < window_end:
+            windows.append((cursor, (window_end - cursor) // ONE_US))
+
+        days.append(day)
+        free.append(windows)
 
     scheduled, unscheduled = [], []
 
-    # 4) Track used hours per day
-    day_hours: dict[date, float] = {}
+    # Track time used per day in µs (no cap → infinite budget, so no None checks below)
+    day_used = [0] * len(days)
+    cap_us   = float("inf") if max_hours_per_day is None else timedelta(hours=max_hours_per_day) // ONE_US
 
-    # 5) Build allowed weekdays set
-    weekday_map = {"MO":0, "TU":1, "WE":2, "TH":3, "FR":4, "SA":5, "SU":6}
-    if allowed_days_of_week:
-        allowed_weekdays = { weekday_map[d] for d in allowed_days_of_week if d in weekday_map }
-    else:
-        allowed_weekdays = set(range(7))
+    def room(i):
+        # the longest task day i can still take (-1: no free window left)
+        longest = max((span for _, span in free[i]), default=-1)
+        return min(longest, cap_us - day_used[i])
 
-    # 6) Schedule each task
+    rooms = _DayRooms([room(i) for i in range(len(days))])
+
+    # 6) Schedule each task: first fit, starting from the last task's day.
+    #    Windows only shrink and the start day only moves forward, so once a
+    #    duration fails to fit, nothing that long fits later either.
+    first  = 0
+    no_fit = float("inf")  # shortest duration (µs) known not to fit
     for t in tasks:
         duration = timedelta(hours=float(t.get("duration_hours", 1.0)))
-        slot     = None
-        probe    = dt
-
-        while probe.date() <= deadline_date:
-            day   = probe.date()
-            wkday = day.weekday()
-
-            if wkday in allowed_weekdays:
-                used = day_hours.get(day, 0.0)
-                if max_hours_per_day is None or (used + duration.total_seconds()/3600) <= max_hours_per_day:
-                    # Build this day's busy slices clipped to WORK_START–WORK_END
-                    window_start = probe.replace(hour=WORK_START, minute=0, second=0, microsecond=0)
-                    window_end   = probe.replace(hour=WORK_END,   minute=0, second=0, microsecond=0)
-
-                    # Clip busy intervals into this window
-                    day_busy = sorted(
-                        ( (max(window_start, bs), min(window_end, be))
-                          for bs, be in busy
-                          if bs.date() <= day <= be.date() ),
-                        key=lambda x: x[0]
-                    )
-
-                    # Carve free windows
-                    free_windows, cursor = [], window_start
-                    for bs, be in day_busy:
-                        if bs > cursor:
-                            free_windows.append((cursor, bs))
-                        cursor = max(cursor, be)
-                    if cursor < window_end:
-                        free_windows.append((cursor, window_end))
-
-                    # Pick the first that fits
-                    for ws, we in free_windows:
-                        if (we - ws) >= duration:
-                            if max_hours_per_day is None or (used + duration.total_seconds()/3600) <= max_hours_per_day:
-                                slot = (ws, ws + duration)
-                                break
-
-            if slot:
-                break
-
-            # Move to next day at WORK_START
-            next_midnight = datetime.combine(
-                day + timedelta(days=1),
-                time(0, 0),
-                tzinfo=LOCAL_TZ
-            )
-            probe = next_midnight.replace(hour=WORK_START, minute=0, second=0, microsecond=0)
-
-        if not slot:
+        dur_us   = duration // ONE_US
+
+        idx = rooms.first_fit(first, max(dur_us, 0)) if dur_us < no_fit else -1
+        if idx < 0:
+            no_fit = min(no_fit, dur_us)
             unscheduled.append({"id": t["id"], "task": t["task"]})
             continue
 
-        # Record and mark busy
+        # the day has room, so one of its windows fits
+        windows = free[idx]
+        w = next(w for w, (_, span) in enumerate(windows) if span >= dur_us)
+        ws, span = windows[w]
+        slot = (ws, ws + duration)
+        # splice the used slice out of the window
+        if span > dur_us:
+            if dur_us > 0:
+                windows[w] = (slot[1], span - dur_us)
+        else:
+            del windows[w]
+        day_used[idx] += dur_us
+        rooms.set(idx, room(idx))
+
         scheduled.append({
             "summary": t["task"],
             "start":   slot[0].isoformat(),
             "end":     slot[1].isoformat()
         })
-        busy.append(slot)
-
-        # Update hours used
-        day_key     = slot[0].date()
-        day_hours[day_key] = day_hours.get(day_key, 0.0) + duration.total_seconds()/3600
 
-        # Next probe starts after this task
-        dt = slot[1]
+        # Next task starts looking on this task's day
+        first = idx
 
     return scheduled, unscheduled
 
 
-def create_calendar_events(service, scheduled):
+def _event_body(ev, event_id=None):
+    body = {
+        "summary": ev["summary"],
+        "start":   {"dateTime": ev["start"], "timeZone": LOCAL_TZ_NAME},
+        "end":     {"dateTime": ev["end"],   "timeZone": LOCAL_TZ_NAME},
+    }
+    if event_id is not None:
+        body["id"] = event_id
+    return body
+
+
+def _insert_request(service, ev, event_id=None):
+    # No attendees, so skip the notification pipeline; only the id is read back
+    return service.events().insert(
+        calendarId="primary",
+        body=_event_body(ev, event_id),
+        sendUpdates="none",
+        fields="id"
+    )
+
+
+def _already_created(exception):
+    # inserting a client-supplied id that exists answers 409 Conflict
+    return isinstance(exception, HttpError) and exception.resp.status == 409
+
+
+def create_calendar_events(service, scheduled, id_prefix=None, http=None):
     """
     Inserts scheduled slots into Google Calendar and returns their IDs.
+
+    Inserts go out through the batch endpoint, BATCH_SIZE per HTTP request,
+    so N events cost ceil(N / BATCH_SIZE) round trips instead of N. Services
+    without batch support fall back to overlapping single inserts on a
+    thread pool. IDs are returned in the same order as `scheduled`.
+
+    With `id_prefix` (lowercase a-v / 0-9 only) event i gets the id
+    f"{id_prefix}{i}", so re-running the same inserts is idempotent: events
+    that already exist are kept and reported, not duplicated.
+
+    `http` is the authorized transport to run the inserts over (None: the
+    service's own).
     """
-    ids = []
-    for ev in scheduled:
-        body = {
-            "summary": ev["summary"],
-            "start":   {"dateTime": ev["start"], "timeZone": str(LOCAL_TZ)},
-            "end":     {"dateTime": ev["end"],   "timeZone": str(LOCAL_TZ)},
-        }
-        created = service.events().insert(calendarId="primary", body=body).execute()
-        ids.append(created.get("id"))
+    def event_id(i):
+        return None if id_prefix is None else f"{id_prefix}{i}"
+
+    if not hasattr(service, "new_batch_http_request"):
+        def insert(i_ev):
+            i, ev = i_ev
+            try:
+                return _insert_request(service, ev, event_id(i)).execute(http=http)["id"]
+            except HttpError as e:
+                if id_prefix is not None and _already_created(e):
+                    return event_id(i)
+                raise
+
+        with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as ex:
+            return list(ex.map(insert, enumerate(scheduled)))
+
+    ids    = [None] * len(scheduled)
+    errors = []
+
+    def collect_id(request_id, response, exception):
+        i = int(request_id)
+        if exception is None:
+            ids[i] = response.get("id")
+        elif id_prefix is not None and _already_created(exception):
+            ids[i] = event_id(i)
+        else:
+            errors.append(exception)
+
+    for offset in range(0, len(scheduled), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=collect_id)
+        for i, ev in enumerate(scheduled[offset:offset + BATCH_SIZE], start=offset):
+            batch.add(_insert_request(service, ev, event_id(i)), request_id=str(i))
+        batch.execute(http=http)
+
+    # Surface the first failed insert the same way the old per-event loop did
+    if errors:
+        raise errors[0]
     return ids
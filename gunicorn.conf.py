@@ -0,0 +1,20 @@
+# gunicorn.conf.py — production server settings (Procfile: gunicorn -c gunicorn.conf.py app:app)
+
+import multiprocessing
+import os
+
+# Every route waits on OpenAI / Google, so use cooperative gevent workers.
+# The gevent worker monkey-patches the stdlib (gevent.monkey.patch_all) when it
+# boots, so httplib2/requests calls yield instead of blocking the worker.
+# Each gevent worker already multiplexes up to worker_connections requests, so
+# one per core is enough; the sync-worker 2n+1 rule would just multiply the
+# per-process caches and connection pools on a many-core host.
+bind               = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers            = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class       = "gevent"
+worker_connections = 1000
+keepalive          = 5
+
+# Import the app in each worker rather than the master; app.py defers its heavy
+# Google imports to first use, so workers boot quickly.
+preload_app        = False
@@ -1,18 +1,107 @@
 # task_breakdown.py
 
 import os
-import json
-from datetime import datetime
+import time
+import random
+import logging
+import orjson
+from datetime import datetime, timezone
 from typing import List, Dict
 
+import httpx
+import openai
 from openai import OpenAI  # v1 client
 
+logger = logging.getLogger(__name__)
+
 # ── 1) INITIALIZE v1 CLIENT ────────────────────────────────────────────────────
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 if not OPENAI_API_KEY:
     raise RuntimeError("Please set OPENAI_API_KEY in environment")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# One client per process keeps its connection pool warm across requests.
+# Retries are ours rather than the SDK's (max_retries=0) so the total wait has
+# a bound: fast failures (429, 5xx, dropped connections) get up to
+# RETRY_ATTEMPTS tries with jittered backoff, honouring Retry-After, but no
+# retry starts after RETRY_BUDGET seconds. A timed-out attempt is never
+# retried, so the worst case is about RETRY_BUDGET + one 60s attempt (~1.5
+# minutes) before the placeholder fallback.
+client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    max_retries=0,
+)
+
+RETRY_ATTEMPTS = 5
+RETRY_BUDGET   = 30.0
+_RETRYABLE     = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+def _retry_after(exc):
+    """Seconds the server asked us to wait, if it said."""
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+def _create_completion(**kwargs):
+    started = time.monotonic()
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            return client.chat.completions.create(**kwargs)
+        except _RETRYABLE as e:
+            # APITimeoutError is an APIConnectionError, but the attempt already
+            # used its full timeout; retrying would only double the wait
+            if isinstance(e, openai.APITimeoutError) or attempt == RETRY_ATTEMPTS:
+                raise
+            wait = _retry_after(e)
+            if wait is None:
+                wait = min(0.5 * 2 ** (attempt - 1), 8.0) * random.uniform(0.75, 1.0)
+            if time.monotonic() - started + wait > RETRY_BUDGET:
+                raise
+            logger.warning("OpenAI call failed (%r); retry %d in %.1fs", e, attempt, wait)
+            time.sleep(wait)
+
+# ── PROMPT ─────────────────────────────────────────────────────────────────────
+# Fixed instructions go in the system message once; the user message carries
+# only the four per-goal facts.
+SYSTEM_PROMPT = (
+    "You break a user's goal into actionable tasks. Produce roughly one task per "
+    "day until the deadline, ordered so the plan moves from the current level to "
+    "the target level, and estimate each task's hours (decimals OK). Reply with "
+    "JSON only: {\"tasks\": [{\"id\": <step number>, \"task\": <description>, "
+    "\"duration_hours\": <hours>}]}"
+)
+
+# gpt-4o-mini beats gpt-3.5-turbo on structured JSON at a lower price;
+# OPENAI_MODEL overrides it per deployment.
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# The model's completion limit; long deadlines would otherwise ask for more
+# than it can produce and the request is rejected outright.
+MAX_OUTPUT_TOKENS = 16384
+
+
+class BreakdownError(Exception):
+    """The model call failed or its reply was unusable; use placeholder_tasks()."""
+
+
+def days_until(deadline: str) -> int:
+    """Whole days from today (UTC) to `deadline`, at least 1; 7 if unparseable."""
+    try:
+        today = datetime.now(timezone.utc).date()
+        dl_date = datetime.fromisoformat(deadline).date()
+        return max((dl_date - today).days, 1)
+    except Exception:
+        return 7
+
+
+def placeholder_tasks(deadline: str) -> List[Dict]:
+    """One 1-hour "(Step N placeholder)" task per day until `deadline`."""
+    return [
+        {"id": i+1, "task": f"(Step {i+1} placeholder)", "duration_hours": 1.0}
+        for i in range(days_until(deadline))
+    ]
 
 
 def breakdown_goal(
@@ -29,77 +118,54 @@ def breakdown_goal(
 
     Returns a list:
       [ { "id": 1, "task": "...", "duration_hours": 2.0 }, … ]
+    Raises BreakdownError if OpenAI fails or its reply can't be parsed.
     """
 
     # 2) Calculate days_left
-    try:
-        today = datetime.utcnow().date()
-        dl_date = datetime.fromisoformat(deadline).date()
-        days_left = max((dl_date - today).days, 1)
-    except Exception:
-        days_left = 7
+    days_left = days_until(deadline)
 
-    # 3) Build prompt
+    # 3) Build prompt: only the per-goal facts, the rules live in SYSTEM_PROMPT
     prompt = (
-        f"You are a helpful assistant that breaks down high-level goals into actionable tasks. "
-        f"The user’s current proficiency is \"{current_level}\" and they wish to reach \"{target_level}\". "
-        f"They have {days_left} day(s) until the deadline. Generate roughly one task per day, "
-        f"but adjust so the plan logically moves from {current_level} to {target_level}. "
-        f"For each task, estimate how many hours it will take (decimal OK).  \n\n"
-        f"Respond with a pure JSON array of objects, each containing:\n"
-        f"  id: integer step number,\n"
-        f"  task: string step description,\n"
-        f"  duration_hours: number hours.\n\n"
         f"Goal: {goal}\n"
-        f"Deadline: {deadline}\n\n"
-        f"Respond ONLY with valid JSON—no extra text or markdown."
+        f"Current level: {current_level}\n"
+        f"Target level: {target_level}\n"
+        f"Days left: {days_left} (deadline {deadline})"
     )
 
-    # 4) Debug print
-    print("=== breakdown_goal called ===")
-    print(f"current_level = {current_level}")
-    print(f"target_level  = {target_level}")
-    print(f"days_left     = {days_left}")
-    print("PROMPT:")
-    print(prompt)
-
-    # 5) Call OpenAI
-    raw = None
+    # 4) Call OpenAI
     try:
-        res = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        res = _create_completion(
+            model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "You are a JSON-output specialist."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user",   "content": prompt},
             ],
             temperature=0.7,
-            max_tokens=days_left * 80,
+            max_tokens=min(days_left * 80, MAX_OUTPUT_TOKENS),
+            # JSON mode: the reply is always one parseable object
+            response_format={"type": "json_object"},
         )
-        raw = res.choices[0].message.content.strip()
-        print("RAW OPENAI RESPONSE:")
-        print(raw)
+        raw = (res.choices[0].message.content or "").strip()
     except Exception as e:
-        print("OpenAI API call failed:", repr(e))
+        logger.warning("OpenAI API call failed: %r", e)
+        raise BreakdownError("OpenAI API call failed") from e
 
-    # 6) Parse or fallback
-    if raw:
-        try:
-            arr = json.loads(raw)
-            tasks: List[Dict] = []
-            for i, obj in enumerate(arr, start=1):
-                desc = obj.get("task", "").strip()
-                dur  = float(obj.get("duration_hours", 1.0))
-                tasks.append({"id": i, "task": desc, "duration_hours": dur})
-            if tasks:
-                return tasks
-            else:
-                raise ValueError("empty array")
-        except Exception as pe:
-            print("JSON parse failed:", repr(pe))
-
-    # 7) Fallback to placeholders
-    print("FALLING BACK to placeholders")
-    return [
-        {"id": i+1, "task": f"(Step {i+1} placeholder)", "duration_hours": 1.0}
-        for i in range(days_left)
-    ]
+    # 5) Parse
+    try:
+        arr = orjson.loads(raw)["tasks"]
+        tasks: List[Dict] = [
+            {
+                "id":             i,
+                "task":           obj.get("task", "").strip(),
+                "duration_hours": float(obj.get("duration_hours", 1.0)),
+            }
+            for i, obj in enumerate(arr, start=1)
+        ]
+        if not tasks:
+            raise ValueError("empty array")
+    except Exception as pe:
+        logger.warning("Could not parse breakdown reply: %r", pe)
+        # model output echoes the user's goal; keep it out of normal logs
+        logger.debug("Unparseable reply: %s", raw[:500])
+        raise BreakdownError("unparseable breakdown reply") from pe
+    return tasks